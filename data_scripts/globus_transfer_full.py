@@ -1,15 +1,19 @@
 import io
 import os
 import argparse
-import urllib.request
+import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 from astropy.io import fits
 
 import numpy as np
-from astropy.table import Table, unique
+from astropy.table import Table
 import globus_sdk
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from globus_sdk.scopes import TransferScopes
 import time
 
@@ -45,7 +49,11 @@ def login_and_get_transfer_client(native_client, *, scopes=TransferScopes.all):
 
 # Submit a transfer with error handling and consent management
 def submit_transfer_with_consent_handling(transfer_client, transfer_data):
-    """Helper function to submit the transfer with consent handling."""
+    """
+    Helper function to submit the transfer with consent handling.
+    Returns the task ID and the TransferClient that submitted it, which is a
+    new client if consent had to be granted.
+    """
     try:
         print("Submitting transfer request...")
         transfer_result = transfer_client.submit_transfer(transfer_data)
@@ -55,7 +63,7 @@ def submit_transfer_with_consent_handling(transfer_client, transfer_data):
             "Monitor the transfer task here: "
             f"https://app.globus.org/activity/{transfer_id}"
         )
-        return transfer_id
+        return transfer_id, transfer_client
     except globus_sdk.TransferAPIError as err:
         # Check if it's a ConsentRequired error
         if hasattr(err.info, "consent_required") and err.info.consent_required:
@@ -87,7 +95,7 @@ def submit_transfer_with_consent_handling(transfer_client, transfer_data):
                 "Monitor the transfer task here: "
                 f"https://app.globus.org/activity/{transfer_id}"
             )
-            return transfer_id
+            return transfer_id, transfer_client
         else:
             # If it's a different Globus API error, re-raise it
             print(f"\nAn unexpected Globus Transfer API error occurred: {err}")
@@ -96,18 +104,10 @@ def submit_transfer_with_consent_handling(transfer_client, transfer_data):
 
 # Main Script Logic
 def read_healpix_ids(txt_path: str) -> np.ndarray:
-    hp = []
-    with open(txt_path, "r") as f:
-        for line in f:
-            line = line.strip()
-            if not line or line.startswith("#"):
-                continue
-            if "#" in line:
-                line = line.split("#", 1)[0].strip()
-            hp.append(int(line))
-    if not hp:
+    hp = np.loadtxt(txt_path, dtype=np.int64, comments="#", ndmin=1)
+    if hp.size == 0:
         raise ValueError(f"No HEALPIX IDs found in file: {txt_path}")
-    return np.array(sorted(set(hp)), dtype=int)
+    return np.unique(hp)
 
 
 def download_tilepix(cache_path: str | None, retries: int, timeout: int) -> Table:
@@ -120,23 +120,23 @@ def download_tilepix(cache_path: str | None, retries: int, timeout: int) -> Tabl
                 # Invalid cache (often an HTML error page); fall through to re-download.
                 pass
 
-    last_err = None
-    for _ in range(retries):
+    # `retries` counts total attempts (as before); urllib3 counts extra retries.
+    retry = Retry(total=max(0, retries - 1), backoff_factor=2, status_forcelist=[502, 503, 504])
+    with requests.Session() as session:
+        session.mount("https://", HTTPAdapter(max_retries=retry))
         try:
-            with urllib.request.urlopen(DESI_TILEPIX_URL, timeout=timeout) as response:
-                data = response.read()
-            break
-        except Exception as err:
-            last_err = err
-            time.sleep(2)
-    else:
-        raise RuntimeError(
-            f"Failed to download tilepix.fits after {retries} attempts. "
-            f"Try again later or pass --tilepix-cache to use a local copy. Last error: {last_err}"
-        )
+            response = session.get(DESI_TILEPIX_URL, timeout=timeout, stream=True)
+            response.raise_for_status()
+            data = response.content
+        except requests.RequestException as err:
+            raise RuntimeError(
+                f"Failed to download tilepix.fits after {retries} attempts. "
+                f"Try again later or pass --tilepix-cache to use a local copy. Last error: {err}"
+            )
 
     try:
-        fits.open(io.BytesIO(data))
+        with fits.open(io.BytesIO(data)) as hdul:
+            t = Table.read(hdul[1])
     except Exception as err:
         raise RuntimeError(
             "Downloaded tilepix.fits is not a valid FITS file. "
@@ -144,7 +144,6 @@ def download_tilepix(cache_path: str | None, retries: int, timeout: int) -> Tabl
             f"Last error: {err}"
         )
 
-    t = Table.read(io.BytesIO(data))
     if cache_path:
         p = Path(cache_path).expanduser()
         p.parent.mkdir(parents=True, exist_ok=True)
@@ -155,6 +154,22 @@ def download_tilepix(cache_path: str | None, retries: int, timeout: int) -> Tabl
     return t
 
 
+def build_coadd_paths(tilepix: Table, destination_path: str) -> tuple[list, list]:
+    """Vectorized source/destination paths for each (HEALPIX, SURVEY, PROGRAM) row."""
+    df = tilepix.to_pandas()
+    healpix = df["HEALPIX"].astype(str)
+    pix_group = (df["HEALPIX"] // 100).astype(str)
+    filename = "coadd-" + df["SURVEY"] + "-" + df["PROGRAM"] + "-" + healpix + ".fits"
+    # Construct source path based on DESI structure
+    source = (
+        "/dr1/spectro/redux/iron/healpix/"
+        + df["SURVEY"] + "/" + df["PROGRAM"] + "/" + pix_group + "/" + healpix + "/"
+        + filename
+    )
+    dest = destination_path + "/" + filename
+    return source.tolist(), dest.tolist()
+
+
 def build_transfer_data(
     source_endpoint_id,
     destination_endpoint_id,
@@ -176,6 +191,28 @@ def build_transfer_data(
     )
 
 
+def run_in_background(fn, **kwargs) -> Future:
+    # A daemon thread rather than an executor: Ctrl-C during the interactive
+    # login exits immediately instead of waiting out download retries/backoff.
+    future = Future()
+
+    def target():
+        try:
+            future.set_result(fn(**kwargs))
+        except BaseException as err:
+            future.set_exception(err)
+
+    threading.Thread(target=target, daemon=True).start()
+    return future
+
+
+def positive_int(value: str) -> int:
+    n = int(value)
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {n}")
+    return n
+
+
 def main(args):
     # Globus endpoint IDs
     source_endpoint_id = DESI_GLOBUS_ENDPOINT
@@ -190,40 +227,29 @@ def main(args):
         destination_path = "/" + destination_path
     destination_path = destination_path.rstrip("/")
 
-    # Retrieve the DESI tilepix file
-    print("Loading DESI tilepix file...")
-    tilepix = download_tilepix(
-        cache_path=args.tilepix_cache,
-        retries=args.tilepix_retries,
-        timeout=args.tilepix_timeout,
-    )
-    print("tilepix loaded.")
-    # Filter rows based on args.surveys, keep specific columns, and remove duplicates
-    tilepix = tilepix[np.any([tilepix["SURVEY"] == s for s in args.surveys], axis=0)]
-    if args.programs:
-        tilepix = tilepix[
-            np.any([tilepix["PROGRAM"] == p for p in args.programs], axis=0)
-        ]
-
     healpix_ids = None
     if args.healpix_file:
         healpix_ids = read_healpix_ids(args.healpix_file)
     elif args.healpix:
         healpix_ids = np.array(sorted(set(args.healpix)), dtype=int)
-    if healpix_ids is not None:
-        healpix_set = set(int(x) for x in healpix_ids)
-        tilepix = tilepix[np.array([int(h) in healpix_set for h in tilepix["HEALPIX"]])]
 
-    tilepix = tilepix["HEALPIX", "SURVEY", "PROGRAM"]
-    tilepix = unique(tilepix, keys=["HEALPIX", "SURVEY", "PROGRAM"])
-    print(
-        f"Found {len(tilepix)} unique HEALPIX entries "
-        f"for surveys: {', '.join(args.surveys)}"
+    # Retrieve the DESI tilepix file in the background while the user logs in
+    print("Loading DESI tilepix file in the background...")
+    tilepix_future = run_in_background(
+        download_tilepix,
+        cache_path=args.tilepix_cache,
+        retries=args.tilepix_retries,
+        timeout=args.tilepix_timeout,
     )
 
     # --- Globus Authentication and Transfer Setup ---
     native_client = globus_sdk.NativeAppAuthClient(CLIENT_ID)
 
+    # Surface a download that already failed (e.g. no network, cache error)
+    # before asking the user to log in.
+    if tilepix_future.done() and tilepix_future.exception() is not None:
+        raise tilepix_future.exception()
+
     # Initial login attempt
     print("\nStarting Globus authentication...")
     transfer_client = login_and_get_transfer_client(native_client)
@@ -231,8 +257,44 @@ def main(args):
     # Skip endpoint activation check as we trust they are working
     print("\nAssuming endpoints are already activated...")
 
-    # Create batches of transfers for better reliability
-    batch_size = args.batch_size
+    tilepix = tilepix_future.result()
+    print("tilepix loaded.")
+    # FITS string columns load as bytes; decode so np.isin can compare against str
+    tilepix.convert_bytestring_to_unicode()
+    # Filter rows based on args.surveys, keep specific columns, and remove duplicates
+    tilepix = tilepix[np.isin(tilepix["SURVEY"], args.surveys)]
+    if args.programs:
+        tilepix = tilepix[np.isin(tilepix["PROGRAM"], args.programs)]
+    if healpix_ids is not None:
+        tilepix = tilepix[
+            np.isin(
+                np.asarray(tilepix["HEALPIX"], dtype=np.int64),
+                healpix_ids.astype(np.int64),
+            )
+        ]
+
+    key_cols = ["HEALPIX", "SURVEY", "PROGRAM"]
+    tilepix = tilepix[key_cols]
+    # np.unique on a structured view; idx is in sorted key order, like astropy's unique
+    keys = np.rec.fromarrays([np.asarray(tilepix[c]) for c in key_cols], names=key_cols)
+    _, idx = np.unique(keys, return_index=True)
+    tilepix = tilepix[idx]
+    print(
+        f"Found {len(tilepix)} unique HEALPIX entries "
+        f"for surveys: {', '.join(args.surveys)}"
+    )
+
+    # Create batches of transfers for better reliability. Split the files so
+    # that --concurrent-tasks batches are in flight, with at least 16 files per
+    # task (Globus runs a handful of parallel streams per task) and at most
+    # --batch-size. With --max-batches, keep full --batch-size batches so the
+    # cap still bounds the number of files the same way.
+    if args.max_batches is None:
+        batch_size = min(
+            args.batch_size, max(16, len(tilepix) // args.concurrent_tasks)
+        )
+    else:
+        batch_size = args.batch_size
     total_batches = (len(tilepix) + batch_size - 1) // batch_size
     if args.max_batches is not None:
         total_batches = min(total_batches, args.max_batches)
@@ -248,9 +310,10 @@ def main(args):
         dest_filename = os.path.basename(item)
         static_files.append((item, os.path.join(destination_path, dest_filename)))
 
-    all_transfer_ids = []
+    source_paths, dest_paths = build_coadd_paths(tilepix, destination_path)
+    batches = []
 
-    # Process the batches
+    # Build the batches
     for batch_num in range(total_batches):
         start_idx = batch_num * batch_size
         end_idx = min((batch_num + 1) * batch_size, len(tilepix))
@@ -278,39 +341,55 @@ def main(args):
 
         # Add items for this batch of healpix pixels
         print(f"Adding HEALPIX coadd files to batch {batch_num + 1}...")
-        batch_tilepix = tilepix[start_idx:end_idx]
-
-        for row in batch_tilepix:
-            healpix = row["HEALPIX"]
-            survey = row["SURVEY"]
-            program = row["PROGRAM"]
-            # Construct source path based on DESI structure
-            pix_group = int(healpix / 100)
-            source_path = (
-                "/dr1/spectro/redux/iron/healpix/"
-                f"{survey}/{program}/{pix_group}/{healpix}/"
-                f"coadd-{survey}-{program}-{healpix}.fits"
-            )
-            dest_filename = f"coadd-{survey}-{program}-{healpix}.fits"
-            transfer_data.add_item(
-                source_path, os.path.join(destination_path, dest_filename)
-            )
-
-        # Submit this batch
-        print(f"Submitting batch {batch_num + 1} with {len(batch_tilepix)} files...")
-        transfer_id = submit_transfer_with_consent_handling(
-            transfer_client, transfer_data
-        )
-        all_transfer_ids.append(transfer_id)
+        for source_path, dest_path in zip(
+            source_paths[start_idx:end_idx], dest_paths[start_idx:end_idx]
+        ):
+            transfer_data.add_item(source_path, dest_path)
+
+        batches.append((transfer_data, end_idx - start_idx))
+
+    if not batches:
+        print("\nNo files to transfer.")
+        return
+
+    # Submit the first batch on the main thread so a consent re-login (which
+    # prompts on stdin) happens at most once, then submit the rest concurrently.
+    first_data, first_count = batches[0]
+    print(f"\nSubmitting batch 1 with {first_count} files...")
+    first_id, transfer_client = submit_transfer_with_consent_handling(
+        transfer_client, first_data
+    )
 
-        if batch_num < total_batches - 1 and args.batch_delay > 0:
-            print(f"Waiting {args.batch_delay} seconds before submitting next batch...")
-            time.sleep(args.batch_delay)
+    transfer_ids = {1: first_id}
+    errors = []
+    with ThreadPoolExecutor(max_workers=args.concurrent_tasks) as ex:
+        futures = {}
+        for batch_num, (transfer_data, count) in enumerate(batches[1:], start=2):
+            if args.batch_delay > 0:
+                time.sleep(args.batch_delay)
+            print(f"Submitting batch {batch_num} with {count} files...")
+            future = ex.submit(
+                submit_transfer_with_consent_handling,
+                transfer_client,
+                transfer_data,
+            )
+            futures[future] = batch_num
+        for future in as_completed(futures):
+            try:
+                transfer_ids[futures[future]] = future.result()[0]
+            except Exception as err:
+                print(f"Batch {futures[future]} failed: {err}")
+                errors.append(err)
 
-    print("\nAll batches submitted successfully!")
+    # Report every task that did get submitted, even if another batch failed.
     print("Transfer IDs:")
-    for i, tid in enumerate(all_transfer_ids):
-        print(f"  Batch {i+1}: https://app.globus.org/activity/{tid}")
+    for batch_num, tid in sorted(transfer_ids.items()):
+        print(f"  Batch {batch_num}: https://app.globus.org/activity/{tid}")
+    if errors:
+        raise RuntimeError(
+            f"{len(errors)} of {len(batches)} batch submissions failed."
+        ) from errors[0]
+    print("\nAll batches submitted successfully!")
 
 
 if __name__ == "__main__":
@@ -373,7 +452,7 @@ if __name__ == "__main__":
         "--tilepix-retries",
         type=int,
         default=3,
-        help="Number of retries when downloading tilepix.fits (default: 3).",
+        help="Number of download attempts for tilepix.fits (default: 3).",
     )
     parser.add_argument(
         "--tilepix-timeout",
@@ -385,19 +464,28 @@ if __name__ == "__main__":
         "--batch-size",
         type=int,
         default=500,
-        help="Number of files per batch (default: 500)",
+        help="Maximum number of files per batch (default: 500)",
     )
     parser.add_argument(
         "--batch-delay",
         type=int,
-        default=5,
-        help="Delay in seconds between batch submissions (default: 5)",
+        default=0,
+        help="Delay in seconds between starting batch submissions (default: 0)",
+    )
+    parser.add_argument(
+        "--concurrent-tasks",
+        type=positive_int,
+        default=8,
+        help="Maximum number of batch submissions in flight (default: 8)",
     )
     parser.add_argument(
         "--max-batches",
         type=int,
         default=None,
-        help="Maximum number of batches to submit (default: no limit)",
+        help=(
+            "Maximum number of batches to submit (default: no limit). When set, "
+            "batches use the full --batch-size instead of the adaptive size."
+        ),
     )
     parser.add_argument(
         "--sync-level",
@@ -30,18 +30,32 @@ def main() -> None:
         default=None,
         help="Output CSV path (default: <input>.with_pix64.csv).",
     )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=1_000_000,
+        help="Rows read and written per chunk (default: 1000000).",
+    )
     args = parser.parse_args()
 
-    df = pd.read_csv(args.csv)
-    pix64 = desi_pix64_from_radec(df[args.ra_col].values, df[args.dec_col].values)
-    df["pix64"] = pix64.astype("int64")
-    df["pix64_group"] = (df["pix64"] // 100).astype("int64")
-
     out_path = args.out
     if out_path is None:
         out_path = args.csv.replace(".csv", ".with_pix64.csv")
 
-    df.to_csv(out_path, index=False)
+    with open(out_path, "w", newline="") as out_f:
+        # Read every column as text so passthrough values are written back verbatim
+        # and no column's format depends on per-chunk dtype inference (e.g. ints
+        # turning into floats in a chunk that has blanks). RA/DEC are converted
+        # to float in desi_pix64_from_radec.
+        chunks = pd.read_csv(
+            args.csv, chunksize=args.chunksize, dtype=str, keep_default_na=False
+        )
+        for i, df in enumerate(chunks):
+            pix64 = desi_pix64_from_radec(df[args.ra_col].values, df[args.dec_col].values)
+            df["pix64"] = pix64.astype("int64")
+            df["pix64_group"] = (df["pix64"] // 100).astype("int64")
+            df.to_csv(out_f, header=(i == 0), index=False)
+
     print(f"Wrote {out_path}")
 
 
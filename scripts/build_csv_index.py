@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+import argparse
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from scripts.trim_coadd_matches import index_cache_path, load_or_build_index  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Build (or refresh) the cached KD-tree/healpix index for a crossmatch catalog."
+    )
+    parser.add_argument("csv", help="CSV or Parquet path with RA/DEC columns.")
+    parser.add_argument("--ra-col", default="RA_DESI")
+    parser.add_argument("--dec-col", default="DEC_DESI")
+    parser.add_argument(
+        "--rebuild", action="store_true", help="Ignore an existing cache and rebuild it."
+    )
+    args = parser.parse_args()
+
+    csv_path = Path(args.csv)
+    index = load_or_build_index(csv_path, args.ra_col, args.dec_col, rebuild=args.rebuild)
+    print(
+        f"Index for {index['tree'].n} rows in {len(index['bucket_pix'])} healpix buckets: "
+        f"{index_cache_path(csv_path)}"
+    )
+
+
+if __name__ == "__main__":
+    main()
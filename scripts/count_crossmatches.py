@@ -1,32 +1,37 @@
 #!/usr/bin/env python3
 import argparse
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 import h5py
 import numpy as np
 import pandas as pd
+from astropy.coordinates import SkyCoord
+import astropy.units as u
 
 
-def min_sep_arcsec_chunked(ra1, dec1, ra2, dec2, chunk_size=1000):
-    ra2r = np.deg2rad(ra2)
-    dec2r = np.deg2rad(dec2)
-    sin_dec2 = np.sin(dec2r)[None, :]
-    cos_dec2 = np.cos(dec2r)[None, :]
-
-    min_sep = np.full(len(ra1), np.inf, dtype=np.float64)
-    for start in range(0, len(ra1), chunk_size):
-        end = min(start + chunk_size, len(ra1))
-        ra1r = np.deg2rad(ra1[start:end])[:, None]
-        dec1r = np.deg2rad(dec1[start:end])[:, None]
-        sin_dec1 = np.sin(dec1r)
-        cos_dec1 = np.cos(dec1r)
-        cos_dra = np.cos(ra1r - ra2r[None, :])
-        cos_sep = sin_dec1 * sin_dec2 + cos_dec1 * cos_dec2 * cos_dra
-        cos_sep = np.clip(cos_sep, -1.0, 1.0)
-        sep = np.arccos(cos_sep)
-        sep_arcsec = np.rad2deg(sep) * 3600.0
-        min_sep[start:end] = sep_arcsec.min(axis=1)
-    return min_sep
+def read_dataset(ds):
+    out = np.empty(ds.shape, dtype=ds.dtype)
+    if out.size:
+        ds.read_direct(out)
+    return out
+
+
+def process_one(path, ra1, dec1, max_arcsec):
+    # Returns (healpix, n_csv, n_hdf, matches); n_hdf is None and matches holds
+    # the error if the HDF5 file cannot be opened.
+    healpix = int(path.parent.name.split("=")[1])
+    try:
+        with h5py.File(path, "r") as f:
+            ra2 = read_dataset(f["desi/edr_sv3_ra"])
+            dec2 = read_dataset(f["desi/edr_sv3_dec"])
+    except OSError as e:
+        return healpix, len(ra1), None, e
+
+    csv_coords = SkyCoord(ra=ra1 * u.deg, dec=dec1 * u.deg)
+    hdf_coords = SkyCoord(ra=ra2 * u.deg, dec=dec2 * u.deg)
+    _, idx_csv, _, _ = csv_coords.search_around_sky(hdf_coords, max_arcsec * u.arcsec)
+    return healpix, len(ra1), len(ra2), len(np.unique(idx_csv))
 
 
 def parse_args():
@@ -54,10 +59,10 @@ def parse_args():
         help="Optional healpix to limit the scan.",
     )
     parser.add_argument(
-        "--chunk-size",
+        "--workers",
         type=int,
-        default=1000,
-        help="Chunk size for coordinate matching to reduce memory usage.",
+        default=None,
+        help="Number of worker processes (default: one per CPU).",
     )
     return parser.parse_args()
 
@@ -67,11 +72,17 @@ def main():
     csv_path = Path(args.csv)
     hdf5_root = Path(args.hdf5_root)
 
-    csv = pd.read_csv(csv_path, usecols=["RA_DESI", "DEC_DESI", "healpix"])
+    # Keep RA/DEC in float64: float32 loses sub-arcsec precision.
+    csv = pd.read_csv(
+        csv_path,
+        usecols=["RA_DESI", "DEC_DESI", "healpix"],
+        dtype={"RA_DESI": "float64", "DEC_DESI": "float64", "healpix": "int32"},
+        engine="pyarrow",
+    )
     if args.healpix is not None:
         csv = csv[csv["healpix"] == args.healpix]
 
-    grouped = {hp: grp for hp, grp in csv.groupby("healpix")}
+    csv = csv.set_index("healpix").sort_index()
 
     paths = sorted(hdf5_root.glob("healpix=*/crossmatch_desi.hdf5"))
     if args.healpix is not None:
@@ -81,37 +92,34 @@ def main():
     total_hdf = 0
     total_matches = 0
 
-    for path in paths:
-        healpix = int(path.parent.name.split("=")[1])
-        csv_hp = grouped.get(healpix)
-        if csv_hp is None or len(csv_hp) == 0:
-            print(f"healpix={healpix}: CSV rows=0; skipping")
-            continue
-
-        try:
-            with h5py.File(path, "r") as f:
-                ra2 = f["desi/edr_sv3_ra"][:]
-                dec2 = f["desi/edr_sv3_dec"][:]
-        except OSError as e:
-            print(f"healpix={healpix}: failed to open HDF5 ({e}); skipping")
-            continue
-
-        ra1 = csv_hp["RA_DESI"].values
-        dec1 = csv_hp["DEC_DESI"].values
-
-        min_sep = min_sep_arcsec_chunked(
-            ra1, dec1, ra2, dec2, chunk_size=args.chunk_size
-        )
-        matches = int((min_sep <= args.max_arcsec).sum())
-
-        total_csv += len(csv_hp)
-        total_hdf += len(ra2)
-        total_matches += matches
-
-        print(
-            f"healpix={healpix}: CSV rows={len(csv_hp)} | "
-            f"HDF rows={len(ra2)} | matches<= {args.max_arcsec}\" = {matches}"
-        )
+    with ProcessPoolExecutor(max_workers=args.workers) as ex:
+        jobs = []
+        for path in paths:
+            healpix = int(path.parent.name.split("=")[1])
+            try:
+                csv_hp = csv.loc[healpix]
+            except KeyError:
+                print(f"healpix={healpix}: CSV rows=0; skipping")
+                continue
+            # A single matching row comes back as a Series of scalars.
+            ra1 = np.atleast_1d(csv_hp["RA_DESI"])
+            dec1 = np.atleast_1d(csv_hp["DEC_DESI"])
+            jobs.append(ex.submit(process_one, path, ra1, dec1, args.max_arcsec))
+
+        for job in jobs:
+            healpix, n_csv, n_hdf, matches = job.result()
+            if n_hdf is None:
+                print(f"healpix={healpix}: failed to open HDF5 ({matches}); skipping")
+                continue
+
+            total_csv += n_csv
+            total_hdf += n_hdf
+            total_matches += matches
+
+            print(
+                f"healpix={healpix}: CSV rows={n_csv} | "
+                f"HDF rows={n_hdf} | matches<= {args.max_arcsec}\" = {matches}"
+            )
 
     print(
         f"TOTAL: CSV rows={total_csv} | HDF rows={total_hdf} | "
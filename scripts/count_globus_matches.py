@@ -1,7 +1,10 @@
 #!/usr/bin/env python3
 import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 from astropy.io import fits
 from astropy.coordinates import SkyCoord
@@ -44,29 +47,57 @@ def parse_args():
         default=None,
         help="Limit the number of CSV rows (for quick tests).",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=8,
+        help="Number of threads reading coadd files (default: 8).",
+    )
     return parser.parse_args()
 
 
 def load_csv_coords(csv_path: Path, limit: int | None) -> SkyCoord:
-    df = pd.read_csv(csv_path, usecols=["RA_DESI", "DEC_DESI"])
+    df = pd.read_csv(
+        csv_path,
+        usecols=["RA_DESI", "DEC_DESI"],
+        dtype={"RA_DESI": "float64", "DEC_DESI": "float64"},
+        engine="pyarrow",
+    )
     if limit is not None:
         df = df.head(limit)
     return SkyCoord(ra=df["RA_DESI"].values * u.deg, dec=df["DEC_DESI"].values * u.deg)
 
 
-def load_fibermap_coords(path: Path) -> SkyCoord:
-    with fits.open(path) as hdul:
+def load_fibermap_coords(path: Path) -> tuple[np.ndarray, np.ndarray]:
+    with fits.open(path, memmap=True) as hdul:
         fm = hdul["FIBERMAP"].data
         cols = fm.columns.names
         if "TARGET_RA" in cols and "TARGET_DEC" in cols:
-            ra = fm["TARGET_RA"]
-            dec = fm["TARGET_DEC"]
+            ra_name, dec_name = "TARGET_RA", "TARGET_DEC"
         elif "RA" in cols and "DEC" in cols:
-            ra = fm["RA"]
-            dec = fm["DEC"]
+            ra_name, dec_name = "RA", "DEC"
         else:
             raise RuntimeError(f"No RA/DEC columns found in {path}")
-    return SkyCoord(ra=ra * u.deg, dec=dec * u.deg)
+        # FITS columns are big-endian, so this converts out of the memmap
+        # before the file is closed.
+        ra = np.asarray(fm.field(ra_name), dtype=np.float64)
+        dec = np.asarray(fm.field(dec_name), dtype=np.float64)
+    return ra, dec
+
+
+def count_file_matches(
+    path: Path, ra: np.ndarray, dec: np.ndarray, csv_coords: SkyCoord, max_arcsec: float
+) -> set[int]:
+    coadd_coords = SkyCoord(ra=ra * u.deg, dec=dec * u.deg)
+    idx_coadd, idx_csv, _, _ = csv_coords.search_around_sky(
+        coadd_coords, max_arcsec * u.arcsec
+    )
+    csv_matches = set(idx_csv.tolist())
+    print(
+        f"{path.name}: targets={len(coadd_coords)} "
+        f"csv_matches<= {max_arcsec}\" = {len(csv_matches)}"
+    )
+    return csv_matches
 
 
 def main():
@@ -86,18 +117,23 @@ def main():
 
     total_csv_matches = set()
 
-    for path in files:
-        coadd_coords = load_fibermap_coords(path)
-        idx_csv, idx_coadd, _, _ = csv_coords.search_around_sky(
-            coadd_coords, args.max_arcsec * u.arcsec
-        )
-        csv_matches = set(idx_csv.tolist())
-        total_csv_matches.update(csv_matches)
-
-        print(
-            f"{path.name}: targets={len(coadd_coords)} "
-            f"csv_matches<= {args.max_arcsec}\" = {len(csv_matches)}"
-        )
+    # Keep a bounded window of reads in flight (consumed in file order) so only
+    # a few files' coordinates are buffered at once, not the whole tree's.
+    window = 2 * args.workers
+    with ThreadPoolExecutor(max_workers=args.workers) as ex:
+        in_flight = deque()
+        for path in files:
+            in_flight.append((path, ex.submit(load_fibermap_coords, path)))
+            if len(in_flight) >= window:
+                path_done, future = in_flight.popleft()
+                total_csv_matches.update(
+                    count_file_matches(path_done, *future.result(), csv_coords, args.max_arcsec)
+                )
+        while in_flight:
+            path_done, future = in_flight.popleft()
+            total_csv_matches.update(
+                count_file_matches(path_done, *future.result(), csv_coords, args.max_arcsec)
+            )
 
     print(f"TOTAL unique CSV matches<= {args.max_arcsec}\": {len(total_csv_matches)}")
 
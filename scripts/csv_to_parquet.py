@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+import argparse
+from pathlib import Path
+
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Convert the crossmatch CSV to zstd-compressed Parquet."
+    )
+    parser.add_argument("csv", help="Input CSV path.")
+    parser.add_argument(
+        "--out",
+        default=None,
+        help="Output Parquet path (default: <input> with a .parquet suffix).",
+    )
+    args = parser.parse_args()
+
+    out_path = Path(args.out) if args.out else Path(args.csv).with_suffix(".parquet")
+    table = pacsv.read_csv(args.csv)
+    pq.write_table(table, out_path, compression="zstd")
+    print(f"Wrote {out_path} ({table.num_rows} rows)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 import argparse
 import math
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 import pandas as pd
@@ -15,10 +16,10 @@ def guess_nside_from_maxpix(maxpix: int) -> int:
     return nside
 
 
-def ang2pix_from_radec(nside: int, ra_deg: np.ndarray, dec_deg: np.ndarray, nest: bool) -> np.ndarray:
+def radec_to_thetaphi(ra_deg: np.ndarray, dec_deg: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
     theta = np.deg2rad(90.0 - dec_deg)
     phi = np.deg2rad(np.mod(ra_deg, 360.0))
-    return hp.ang2pix(nside, theta, phi, nest=nest)
+    return theta, phi
 
 
 def main() -> None:
@@ -28,6 +29,17 @@ def main() -> None:
     ap.add_argument("--dec-col", default="DEC_DESI")
     ap.add_argument("--hp-col", default="healpix")
     ap.add_argument("--max-rows", type=int, default=200000)
+    ap.add_argument(
+        "--stop-match-rate",
+        type=float,
+        default=0.9999,
+        help="Stop the scheme sweep once a match rate reaches this value.",
+    )
+    ap.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Evaluate and print every candidate scheme.",
+    )
     ap.add_argument("--out-pix64", default="desi_dr1_pix64_unique.txt")
     ap.add_argument("--out-pix64-csv", default="desi_dr1_pix64_unique.csv")
     args = ap.parse_args()
@@ -37,6 +49,7 @@ def main() -> None:
     ra = df[args.ra_col].to_numpy(dtype=float)
     dec = df[args.dec_col].to_numpy(dtype=float)
     hp_in = df[args.hp_col].to_numpy(dtype=np.int64)
+    theta, phi = radec_to_thetaphi(ra, dec)
 
     maxpix = int(np.nanmax(hp_in))
     minpix = int(np.nanmin(hp_in))
@@ -56,16 +69,33 @@ def main() -> None:
     )
     candidates = [n for n in candidates if n >= 1]
 
+    def match_rate(scheme: tuple[int, bool]) -> float:
+        nside, nest = scheme
+        return (hp.ang2pix(nside, theta, phi, nest=nest) == hp_in).mean()
+
+    # Most likely schemes first (the guessed NSIDE), so the early stop usually
+    # fires after one or two ang2pix calls.
+    candidates.sort(key=lambda n: n != nside_guess)
+    schemes = [(nside, nest) for nside in candidates for nest in (True, False)]
+
     best = None
     print("\n=== Matching (recompute pix from RA/DEC and compare to healpix column) ===")
-    for nside in candidates:
-        for nest in (True, False):
-            pix = ang2pix_from_radec(nside, ra, dec, nest=nest)
-            match = (pix == hp_in).mean()
-            tag = "NESTED" if nest else "RING"
-            print(f"nside={nside:>4} ordering={tag:>6}  match_rate={match:.6f}")
-            if best is None or match > best[0]:
-                best = (match, nside, nest)
+    if args.verbose:
+        # Every scheme is wanted; hp.ang2pix releases the GIL, so threads share
+        # theta/phi without copies.
+        with ThreadPoolExecutor() as ex:
+            rates = ex.map(match_rate, schemes)
+    else:
+        # Serial and lazy, so the early stop really skips the remaining schemes.
+        rates = map(match_rate, schemes)
+    for (nside, nest), match in zip(schemes, rates):
+        tag = "NESTED" if nest else "RING"
+        print(f"nside={nside:>4} ordering={tag:>6}  match_rate={match:.6f}")
+        if best is None or match > best[0]:
+            best = (match, nside, nest)
+        if match >= args.stop_match_rate and not args.verbose:
+            # Near-perfect match; skip the remaining schemes unless asked.
+            break
 
     best_match, best_nside, best_nest = best
     print("\n=== Best inferred scheme for healpix column ===")
@@ -79,7 +109,7 @@ def main() -> None:
         print("The healpix column may be a shard/bucket id or computed differently.")
 
     # DESI DR1 coadds use NSIDE=64, NESTED
-    pix64 = ang2pix_from_radec(64, ra, dec, nest=True)
+    pix64 = hp.ang2pix(64, theta, phi, nest=True)
     pix64_unique = np.unique(pix64)
 
     out_df = pd.DataFrame(
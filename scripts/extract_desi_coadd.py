@@ -1,5 +1,8 @@
 #!/usr/bin/env python3
 import argparse
+import asyncio
+import glob
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import h5py
@@ -7,6 +10,10 @@ import numpy as np
 from astropy.io import fits
 
 
+# Every output dataset is chunked and LZF-compressed (byte shuffle helps float32).
+DATASET_KWARGS = {"chunks": True, "compression": "lzf", "shuffle": True}
+
+
 def find_hdu_by_name(hdul, name):
     for hdu in hdul:
         if hdu.name == name:
@@ -14,11 +21,17 @@ def find_hdu_by_name(hdul, name):
     return None
 
 
+def as_float32(data):
+    # Native-endian float32 for the HDF5 output; FITS data is big-endian, so this
+    # byteswaps into a new array on little-endian hosts.
+    return data.astype("=f4", copy=False)
+
+
 def load_band_arrays(hdul, band):
     for suffix in ("WAVELENGTH", "WAVE"):
         hdu = find_hdu_by_name(hdul, f"{band}_{suffix}")
         if hdu is not None:
-            wave = hdu.data.astype("float32")
+            wave = as_float32(hdu.data)
             break
     else:
         wave = None
@@ -30,8 +43,8 @@ def load_band_arrays(hdul, band):
     if flux_hdu is None:
         return None
 
-    flux = flux_hdu.data.astype("float32")
-    ivar = ivar_hdu.data.astype("float32") if ivar_hdu is not None else None
+    flux = as_float32(flux_hdu.data)
+    ivar = as_float32(ivar_hdu.data) if ivar_hdu is not None else None
     mask = mask_hdu.data.astype("bool") if mask_hdu is not None else None
     return wave, flux, ivar, mask
 
@@ -50,23 +63,7 @@ def extract_fibermap_columns(fibermap):
     return out
 
 
-def main():
-    parser = argparse.ArgumentParser(
-        description="Extract spectra + coordinates/IDs from a DESI coadd file."
-    )
-    parser.add_argument("--coadd", required=True, help="Path to coadd-*.fits file.")
-    parser.add_argument("--out", required=True, help="Output HDF5 path.")
-    parser.add_argument(
-        "--bands",
-        default="B,R,Z",
-        help="Comma-separated list of bands to extract (default: B,R,Z).",
-    )
-    args = parser.parse_args()
-
-    coadd_path = Path(args.coadd)
-    out_path = Path(args.out)
-    bands = [b.strip().upper() for b in args.bands.split(",") if b.strip()]
-
+def process_one(coadd_path: Path, out_path: Path, bands: list[str]) -> None:
     with fits.open(coadd_path) as hdul:
         fibermap_hdu = find_hdu_by_name(hdul, "FIBERMAP")
         fibermap = fibermap_hdu.data if fibermap_hdu is not None else None
@@ -85,20 +82,99 @@ def main():
 
     with h5py.File(out_path, "w") as out:
         for key, values in meta.items():
-            out.create_dataset(key, data=values)
+            out.create_dataset(key, data=values, **DATASET_KWARGS)
 
         for band, (wave, flux, ivar, mask) in band_data.items():
             grp = out.create_group(band.lower())
             if wave is not None:
-                grp.create_dataset("wavelength", data=wave)
-            grp.create_dataset("flux", data=flux)
+                grp.create_dataset("wavelength", data=wave, **DATASET_KWARGS)
+            grp.create_dataset("flux", data=flux, **DATASET_KWARGS)
             if ivar is not None:
-                grp.create_dataset("ivar", data=ivar)
+                grp.create_dataset("ivar", data=ivar, **DATASET_KWARGS)
             if mask is not None:
-                grp.create_dataset("mask", data=mask)
+                # Boolean mask packed 8 pixels per byte along the wavelength axis;
+                # unpack with np.unpackbits(ds[:], axis=-1, count=ds.attrs["nbits"]).
+                ds = grp.create_dataset(
+                    "mask", data=np.packbits(mask, axis=-1), **DATASET_KWARGS
+                )
+                ds.attrs["nbits"] = mask.shape[-1]
 
     print(f"Wrote {out_path}")
 
 
+async def main_async(
+    jobs: list[tuple[Path, Path]], bands: list[str], workers: int
+) -> None:
+    # FITS reads and HDF5 writes release the GIL for disk I/O, so a thread
+    # pool overlaps one file's read with another's write.
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        await asyncio.gather(
+            *(
+                loop.run_in_executor(pool, process_one, coadd_path, out_path, bands)
+                for coadd_path, out_path in jobs
+            )
+        )
+
+
+def expand_coadd_args(patterns: list[str]) -> list[Path]:
+    paths = []
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            paths.extend(Path(p) for p in sorted(glob.glob(pattern)))
+        else:
+            paths.append(Path(pattern))
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Extract spectra + coordinates/IDs from DESI coadd files."
+    )
+    parser.add_argument(
+        "--coadd",
+        required=True,
+        nargs="+",
+        help="One or more coadd-*.fits paths or glob patterns.",
+    )
+    parser.add_argument(
+        "--out", default=None, help="Output HDF5 path (single coadd only)."
+    )
+    parser.add_argument(
+        "--out-dir",
+        default=None,
+        help="Output directory; each coadd is written to <stem>.h5.",
+    )
+    parser.add_argument(
+        "--bands",
+        default="B,R,Z",
+        help="Comma-separated list of bands to extract (default: B,R,Z).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Number of coadd files processed concurrently (default: 4).",
+    )
+    args = parser.parse_args()
+
+    coadd_paths = expand_coadd_args(args.coadd)
+    if not coadd_paths:
+        parser.error(f"No coadd files match {args.coadd}")
+    if args.out is not None:
+        if len(coadd_paths) != 1:
+            parser.error("--out takes a single coadd; use --out-dir for several.")
+        jobs = [(coadd_paths[0], Path(args.out))]
+    elif args.out_dir is not None:
+        out_dir = Path(args.out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        jobs = [(p, out_dir / f"{p.stem}.h5") for p in coadd_paths]
+    else:
+        parser.error("one of --out or --out-dir is required.")
+    bands = [b.strip().upper() for b in args.bands.split(",") if b.strip()]
+
+    asyncio.run(main_async(jobs, bands, args.workers))
+
+
 if __name__ == "__main__":
     main()
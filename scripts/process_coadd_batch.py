@@ -1,22 +1,80 @@
 #!/usr/bin/env python3
 import argparse
+import functools
+import os
+from multiprocessing import Pool
 from pathlib import Path
 import sys
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
-from scripts.trim_coadd_matches import trim_coadd_file  # noqa: E402
+from scripts.trim_coadd_matches import (  # noqa: E402
+    load_or_build_index,
+    trim_coadd_file_with_index,
+)
+
+# Set once per worker process by the Pool initializer, so the catalog index is
+# pickled per worker rather than per file.
+_worker_index = None
+
+
+def _init_worker(index) -> None:
+    global _worker_index
+    _worker_index = index
+
+
+def _trim_one(
+    path: Path,
+    max_arcsec: float,
+    report_arcsec: float,
+    delete_original: bool,
+    prefilter: bool,
+    memmap: bool,
+    compress: bool,
+) -> None:
+    trim_coadd_file_with_index(
+        path,
+        _worker_index,
+        max_arcsec,
+        report_arcsec,
+        None,
+        delete_original,
+        prefilter=prefilter,
+        memmap=memmap,
+        compress=compress,
+    )
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Process a directory of coadd files.")
     parser.add_argument("root", help="Directory containing coadd-*.fits files.")
-    parser.add_argument("csv", help="CSV path with RA/DEC columns.")
+    parser.add_argument("csv", help="CSV or Parquet path with RA/DEC columns.")
     parser.add_argument("--ra-col", default="RA_DESI")
     parser.add_argument("--dec-col", default="DEC_DESI")
     parser.add_argument("--max-arcsec", type=float, default=1.0)
     parser.add_argument("--report-arcsec", type=float, default=3.0)
     parser.add_argument("--delete-original", action="store_true")
+    parser.add_argument(
+        "--no-mmap",
+        action="store_true",
+        help="Read coadds without memory mapping (e.g. on network filesystems).",
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="Losslessly tile-compress image HDUs in the trimmed output.",
+    )
+    parser.add_argument(
+        "--no-prefilter",
+        action="store_true",
+        help="Index every catalog row instead of only those near the coadd's healpix footprint.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes (default: half the CPUs, capped at the file count).",
+    )
     args = parser.parse_args()
 
     root = Path(args.root)
@@ -25,17 +83,20 @@ def main() -> None:
         print(f"No coadd files found under {root}")
         return
 
-    for path in files:
-        trim_coadd_file(
-            path,
-            Path(args.csv),
-            args.ra_col,
-            args.dec_col,
-            args.max_arcsec,
-            args.report_arcsec,
-            None,
-            args.delete_original,
-        )
+    index = load_or_build_index(Path(args.csv), args.ra_col, args.dec_col)
+    # Half the cores by default: each worker also does heavy FITS I/O.
+    workers = args.workers or min(len(files), max(1, (os.cpu_count() or 2) // 2))
+    trim_one = functools.partial(
+        _trim_one,
+        max_arcsec=args.max_arcsec,
+        report_arcsec=args.report_arcsec,
+        delete_original=args.delete_original,
+        prefilter=not args.no_prefilter,
+        memmap=not args.no_mmap,
+        compress=args.compress,
+    )
+    with Pool(processes=workers, initializer=_init_worker, initargs=(index,)) as pool:
+        pool.map(trim_one, files, chunksize=1)
 
 
 if __name__ == "__main__":
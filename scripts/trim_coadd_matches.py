@@ -1,62 +1,219 @@
 #!/usr/bin/env python3
 import argparse
+import pickle
+import tempfile
 from pathlib import Path
 
 import numpy as np
-import pandas as pd
-from astropy.coordinates import SkyCoord, search_around_sky
-import astropy.units as u
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+import healpy as hp
 from astropy.io import fits
+from scipy.spatial import cKDTree
 
 
-def load_csv_coords(csv_path: Path, ra_col: str, dec_col: str) -> SkyCoord:
-    df = pd.read_csv(csv_path, usecols=[ra_col, dec_col])
-    return SkyCoord(ra=df[ra_col].values * u.deg, dec=df[dec_col].values * u.deg)
+# Prefilter pixels use the crossmatch CSV's healpix scheme: NSIDE=16, NESTED.
+CSV_HEALPIX_NSIDE = 16
+# Preferred FIBERMAP coordinate columns, in order.
+COADD_RADEC_COLUMNS = (("TARGET_RA", "TARGET_DEC"), ("RA", "DEC"))
 
 
-def load_coadd_coords(hdul: fits.HDUList) -> SkyCoord:
+def radec_to_xyz(ra_deg: np.ndarray, dec_deg: np.ndarray) -> np.ndarray:
+    ra = np.deg2rad(np.asarray(ra_deg, dtype=np.float64))
+    dec = np.deg2rad(np.asarray(dec_deg, dtype=np.float64))
+    cos_dec = np.cos(dec)
+    return np.column_stack([cos_dec * np.cos(ra), cos_dec * np.sin(ra), np.sin(dec)])
+
+
+def arcsec_to_chord(arcsec: float) -> float:
+    # Chord length between two unit vectors separated by `arcsec`.
+    return 2.0 * np.sin(np.deg2rad(arcsec / 3600.0) / 2.0)
+
+
+def chord_to_arcsec(chord: np.ndarray) -> np.ndarray:
+    return np.rad2deg(2.0 * np.arcsin(np.minimum(chord / 2.0, 1.0))) * 3600.0
+
+
+def load_csv_columns(csv_path: Path, columns: list[str]) -> dict[str, np.ndarray]:
+    if csv_path.suffix == ".parquet":
+        tbl = pq.read_table(csv_path, columns=columns)
+    else:
+        # Arrow's CSV reader parses only the requested columns, with no DataFrame.
+        tbl = pacsv.read_csv(
+            csv_path, convert_options=pacsv.ConvertOptions(include_columns=columns)
+        )
+    return {col: tbl.column(col).to_numpy() for col in columns}
+
+
+def load_csv_coords(csv_path: Path, ra_col: str, dec_col: str) -> np.ndarray:
+    cols = load_csv_columns(csv_path, [ra_col, dec_col])
+    return radec_to_xyz(cols[ra_col], cols[dec_col])
+
+
+def load_coadd_coords(hdul: fits.HDUList) -> np.ndarray:
+    # Only the two coordinate fields are read; other HDUs stay untouched.
     fm = hdul["FIBERMAP"].data
-    cols = fm.columns.names
-    if "TARGET_RA" in cols and "TARGET_DEC" in cols:
-        ra = fm["TARGET_RA"]
-        dec = fm["TARGET_DEC"]
-    elif "RA" in cols and "DEC" in cols:
-        ra = fm["RA"]
-        dec = fm["DEC"]
+    colset = set(fm.columns.names)
+    for ra_name, dec_name in COADD_RADEC_COLUMNS:
+        if ra_name in colset and dec_name in colset:
+            break
     else:
         raise RuntimeError("FIBERMAP does not contain RA/DEC columns.")
-    return SkyCoord(ra=ra * u.deg, dec=dec * u.deg)
+    ra = fm.field(ra_name).astype(np.float64, copy=False)
+    dec = fm.field(dec_name).astype(np.float64, copy=False)
+    return radec_to_xyz(ra, dec)
+
+
+def footprint_pixels(xyz: np.ndarray, nside: int = CSV_HEALPIX_NSIDE) -> np.ndarray:
+    # NESTED pixels containing the points plus their neighbours, so matches that
+    # straddle a pixel boundary are not lost.
+    pix = np.unique(hp.vec2pix(nside, xyz[:, 0], xyz[:, 1], xyz[:, 2], nest=True))
+    neighbours = hp.get_all_neighbours(nside, pix, nest=True).ravel()
+    return np.union1d(pix, neighbours[neighbours >= 0])
+
+
+def build_csv_tree(csv_xyz: np.ndarray) -> cKDTree:
+    return cKDTree(csv_xyz, balanced_tree=False, compact_nodes=False)
+
+
+def build_catalog_index(csv_xyz: np.ndarray) -> dict:
+    # Full tree plus the catalog rows bucketed by NSIDE=16 NESTED pixel (CSR
+    # layout: rows of bucket_pix[i] are bucket_rows[bucket_starts[i]:bucket_starts[i+1]]).
+    # Pixels come from RA/DEC, not the catalog's stored healpix column, so a row
+    # with a bad stored pixel is never dropped by the prefilter.
+    pix = hp.vec2pix(CSV_HEALPIX_NSIDE, csv_xyz[:, 0], csv_xyz[:, 1], csv_xyz[:, 2], nest=True)
+    rows = np.argsort(pix, kind="stable")
+    bucket_pix, starts = np.unique(pix[rows], return_index=True)
+    return {
+        "tree": build_csv_tree(csv_xyz),
+        "bucket_pix": bucket_pix,
+        "bucket_starts": np.append(starts, len(rows)),
+        "bucket_rows": rows,
+    }
+
+
+def footprint_rows(index: dict, coadd_xyz: np.ndarray) -> np.ndarray:
+    # Catalog rows in the coadd's healpix footprint, looked up from the buckets.
+    pixels = footprint_pixels(coadd_xyz)
+    bucket_pix = index["bucket_pix"]
+    pos = np.searchsorted(bucket_pix, pixels)
+    hit = pos < len(bucket_pix)
+    hit[hit] = bucket_pix[pos[hit]] == pixels[hit]
+    starts = index["bucket_starts"]
+    rows = index["bucket_rows"]
+    return np.concatenate(
+        [rows[starts[i] : starts[i + 1]] for i in pos[hit]] + [np.empty(0, dtype=rows.dtype)]
+    )
+
+
+def coadd_tree(index: dict, coadd_xyz: np.ndarray, prefilter: bool = True) -> cKDTree:
+    if not prefilter:
+        return index["tree"]
+    # Small per-coadd tree over the footprint rows; tree.data holds the catalog xyz.
+    return build_csv_tree(index["tree"].data[footprint_rows(index, coadd_xyz)])
+
+
+def index_cache_path(csv_path: Path) -> Path:
+    return csv_path.with_name(csv_path.name + ".index.pkl")
+
+
+# Bump when the cached index layout changes so old caches are rebuilt.
+INDEX_CACHE_VERSION = 2
+
 
+def load_or_build_index(
+    csv_path: Path, ra_col: str, dec_col: str, rebuild: bool = False
+) -> dict:
+    # The pickled index is keyed by the catalog's mtime/size and the RA/DEC columns,
+    # so editing or replacing the catalog invalidates it. The cache is unpickled
+    # from next to the data, so only point this at catalogs in trusted directories.
+    cache_path = index_cache_path(csv_path)
+    stat = csv_path.stat()
+    key = (INDEX_CACHE_VERSION, stat.st_mtime_ns, stat.st_size, ra_col, dec_col)
+    if not rebuild and cache_path.exists():
+        try:
+            with open(cache_path, "rb") as f:
+                cached = pickle.load(f)
+            if cached.get("key") == key:
+                return cached["index"]
+        except Exception:
+            # Unreadable or stale-format cache; rebuild below.
+            pass
 
-def find_match_indices(csv_coords: SkyCoord, coadd_coords: SkyCoord, max_arcsec: float) -> np.ndarray:
-    idx_coadd, idx_csv, _, _ = search_around_sky(coadd_coords, csv_coords, max_arcsec * u.arcsec)
-    if len(idx_coadd) == 0:
-        return np.array([], dtype=int)
-    return np.unique(idx_coadd)
+    index = build_catalog_index(load_csv_coords(csv_path, ra_col, dec_col))
+    # Unique temp file per writer so concurrent builds never interleave; the
+    # final rename is atomic.
+    tmp_path = None
+    try:
+        with tempfile.NamedTemporaryFile(
+            dir=cache_path.parent, prefix=cache_path.name, suffix=".tmp", delete=False
+        ) as f:
+            tmp_path = Path(f.name)
+            pickle.dump({"key": key, "index": index}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp_path.replace(cache_path)
+    except OSError as err:
+        print(f"Warning: could not write index cache {cache_path}: {err}")
+        if tmp_path is not None:
+            tmp_path.unlink(missing_ok=True)
+    return index
 
 
-def trim_hdul(hdul: fits.HDUList, keep_idx: np.ndarray) -> fits.HDUList:
+def find_match_indices(
+    csv_tree: cKDTree, coadd_xyz: np.ndarray, max_chord: float
+) -> tuple[np.ndarray, np.ndarray]:
+    # Coadd rows with a CSV neighbour within max_chord, and the chord distance to the
+    # nearest one. Chord distance is monotonic in angle, so cuts can stay in chord space.
+    chord, _ = csv_tree.query(coadd_xyz, k=1, distance_upper_bound=max_chord)
+    idx_coadd = np.flatnonzero(np.isfinite(chord))
+    return idx_coadd, chord[idx_coadd]
+
+
+def make_image_hdu(
+    data: np.ndarray, header: fits.Header, name: str, compress: bool
+) -> fits.ImageHDU | fits.CompImageHDU:
+    # A zero-row CompImageHDU reads back as data=None, losing the (0, nwave) shape
+    # that downstream readers rely on, so empty trims stay uncompressed.
+    if not compress or data.shape[0] == 0:
+        return fits.ImageHDU(data, header=header, name=name)
+    # Lossless tile compression, one row (spectrum) per tile: GZIP_2 without
+    # quantization for floats, RICE_1 for integers.
+    if np.issubdtype(data.dtype, np.floating):
+        kwargs = {"compression_type": "GZIP_2", "quantize_level": 0}
+    else:
+        kwargs = {"compression_type": "RICE_1"}
+    return fits.CompImageHDU(
+        data, header=header, name=name, tile_shape=(1,) + data.shape[1:], **kwargs
+    )
+
+
+def trim_hdul(hdul: fits.HDUList, keep_idx: np.ndarray, compress: bool = False) -> fits.HDUList:
     nrows = len(hdul["FIBERMAP"].data)
-    keep_mask = np.zeros(nrows, dtype=bool)
-    keep_mask[keep_idx] = True
+    # Sorted integer gather: touches only the kept rows, in file order.
+    idx_sorted = np.sort(keep_idx)
 
+    # Every output HDU owns its buffers (gather/take/copy), so the source file can
+    # be closed, and its memmap released, before the trimmed list is written.
     new_hdus = []
     for hdu in hdul:
-        if hdu.data is None:
-            new_hdus.append(hdu.copy())
-            continue
         data = hdu.data
-        if isinstance(hdu, fits.BinTableHDU) and data.shape and data.shape[0] == nrows:
-            new_data = data[keep_mask]
+        if data is None or not data.shape or data.shape[0] != nrows:
+            new_hdus.append(hdu.copy())
+        # CompImageHDU is checked first: older astropy derives it from BinTableHDU.
+        elif isinstance(hdu, (fits.ImageHDU, fits.CompImageHDU)):
+            new_data = np.take(data, idx_sorted, axis=0)
+            new_hdus.append(make_image_hdu(new_data, hdu.header, hdu.name, compress))
+        elif isinstance(hdu, fits.BinTableHDU):
+            new_data = data[idx_sorted]
             new_hdus.append(fits.BinTableHDU(new_data, header=hdu.header, name=hdu.name))
-        elif isinstance(hdu, fits.ImageHDU) and data.shape and data.shape[0] == nrows:
-            new_data = data[keep_mask]
-            new_hdus.append(fits.ImageHDU(new_data, header=hdu.header, name=hdu.name))
         else:
             new_hdus.append(hdu.copy())
     return fits.HDUList(new_hdus)
 
 
+def is_trimmed_path(path: Path) -> bool:
+    return path.name.endswith(".trimmed.fits") or ".trimmed." in path.name
+
+
 def trim_coadd_file(
     coadd_path: Path,
     csv_path: Path,
@@ -66,31 +223,70 @@ def trim_coadd_file(
     report_arcsec: float,
     out_path: Path | None,
     delete_original: bool,
+    prefilter: bool = True,
+    memmap: bool = True,
+    compress: bool = False,
+) -> None:
+    index = load_or_build_index(csv_path, ra_col, dec_col)
+    trim_coadd_file_with_index(
+        coadd_path,
+        index,
+        max_arcsec,
+        report_arcsec,
+        out_path,
+        delete_original,
+        prefilter=prefilter,
+        memmap=memmap,
+        compress=compress,
+    )
+
+
+def trim_coadd_file_with_index(
+    coadd_path: Path,
+    index: dict,
+    max_arcsec: float,
+    report_arcsec: float,
+    out_path: Path | None,
+    delete_original: bool,
+    prefilter: bool = True,
+    memmap: bool = True,
+    compress: bool = False,
 ) -> None:
-    if coadd_path.name.endswith(".trimmed.fits") or ".trimmed." in coadd_path.name:
+    if is_trimmed_path(coadd_path):
         print(f"Skipping already-trimmed file: {coadd_path}")
         return
     out_path = out_path or coadd_path.with_suffix(".trimmed.fits")
 
-    csv_coords = load_csv_coords(csv_path, ra_col, dec_col)
-
-    with fits.open(coadd_path) as hdul:
-        coadd_coords = load_coadd_coords(hdul)
-        keep_idx = find_match_indices(csv_coords, coadd_coords, max_arcsec)
-        report_idx = find_match_indices(csv_coords, coadd_coords, report_arcsec)
-        trimmed = trim_hdul(hdul, keep_idx)
+    # memmap=False reads HDUs into memory, which is faster on some network filesystems.
+    with fits.open(coadd_path, memmap=memmap, lazy_load_hdus=True) as hdul:
+        coadd_xyz = load_coadd_coords(hdul)
+        # The footprint comes from the same coordinates used for matching, so
+        # the coadd is opened once.
+        csv_tree = coadd_tree(index, coadd_xyz, prefilter)
+        # One query at the wider radius; the tighter cut is a subset of it.
+        max_chord = arcsec_to_chord(max_arcsec)
+        report_chord = arcsec_to_chord(report_arcsec)
+        idx_coadd, sep_chord = find_match_indices(
+            csv_tree, coadd_xyz, max(max_chord, report_chord)
+        )
+        keep_idx = np.unique(idx_coadd[sep_chord <= max_chord])
+        report_idx = np.unique(idx_coadd[sep_chord <= report_chord])
+        nrows = len(coadd_xyz)
+        del coadd_xyz, idx_coadd, sep_chord
+        trimmed = trim_hdul(hdul, keep_idx, compress=compress)
+    # The source is closed here; only the trimmed copies are alive during the write.
 
+    n_kept = len(trimmed["FIBERMAP"].data)
+    if n_kept != len(keep_idx):
+        raise RuntimeError("Trimmed FIBERMAP row count does not match kept indices.")
     trimmed.writeto(out_path, overwrite=True)
+    del trimmed
 
-    nrows = len(coadd_coords)
     print(f"coadd rows: {nrows}")
     print(f"matched rows (<= {max_arcsec}\"): {len(keep_idx)}")
     print(f"matched rows (<= {report_arcsec}\"): {len(report_idx)}")
     print(f"wrote: {out_path}")
 
-    if len(keep_idx) != len(trimmed["FIBERMAP"].data):
-        raise RuntimeError("Trimmed FIBERMAP row count does not match kept indices.")
-
     if delete_original:
         coadd_path.unlink()
         print(f"deleted original: {coadd_path}")
@@ -99,13 +295,28 @@ def trim_coadd_file(
 def main() -> None:
     parser = argparse.ArgumentParser(description="Trim a DESI coadd FITS to matched rows.")
     parser.add_argument("coadd", help="Path to coadd-*.fits")
-    parser.add_argument("csv", help="CSV path with RA/DEC columns")
+    parser.add_argument("csv", help="CSV or Parquet path with RA/DEC columns")
     parser.add_argument("--ra-col", default="RA_DESI")
     parser.add_argument("--dec-col", default="DEC_DESI")
     parser.add_argument("--max-arcsec", type=float, default=1.0)
     parser.add_argument("--report-arcsec", type=float, default=3.0)
     parser.add_argument("--out", default=None, help="Output trimmed FITS path")
     parser.add_argument("--delete-original", action="store_true")
+    parser.add_argument(
+        "--no-mmap",
+        action="store_true",
+        help="Read coadds without memory mapping (e.g. on network filesystems).",
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="Losslessly tile-compress image HDUs in the trimmed output.",
+    )
+    parser.add_argument(
+        "--no-prefilter",
+        action="store_true",
+        help="Index every catalog row instead of only those near the coadd's healpix footprint.",
+    )
     args = parser.parse_args()
 
     trim_coadd_file(
@@ -117,6 +328,9 @@ def main() -> None:
         args.report_arcsec,
         Path(args.out) if args.out else None,
         args.delete_original,
+        prefilter=not args.no_prefilter,
+        memmap=not args.no_mmap,
+        compress=args.compress,
     )
 
 
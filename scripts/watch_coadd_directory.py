@@ -1,12 +1,66 @@
 #!/usr/bin/env python3
 import argparse
+import fnmatch
+import queue
 import time
 from pathlib import Path
 import sys
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
-from scripts.trim_coadd_matches import trim_coadd_file  # noqa: E402
+from scripts.trim_coadd_matches import (  # noqa: E402
+    is_trimmed_path,
+    load_or_build_index,
+    trim_coadd_file_with_index,
+)
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # pragma: no cover - optional; fall back to polling
+    FileSystemEventHandler = object
+    Observer = None
+
+COADD_PATTERN = "coadd-*.fits"
+# Drop `seen` entries for vanished sources every this many loop ticks.
+SEEN_PURGE_TICKS = 100
+
+
+class CoaddEventHandler(FileSystemEventHandler):
+    """Queue coadd paths as they are created in (or moved into) the watched directory."""
+
+    def __init__(self, root: Path, events: queue.Queue) -> None:
+        super().__init__()
+        self.root = root.resolve()
+        self.events = events
+
+    def _enqueue(self, path: str) -> None:
+        path = Path(path)
+        # Ignore moves out of the directory (e.g. test mode's renames).
+        if path.parent.resolve() == self.root and fnmatch.fnmatch(path.name, COADD_PATTERN):
+            self.events.put(path)
+
+    def on_created(self, event) -> None:
+        if not event.is_directory:
+            self._enqueue(event.src_path)
+
+    def on_moved(self, event) -> None:
+        if not event.is_directory:
+            self._enqueue(event.dest_path)
+
+
+def start_observer(root: Path, events: queue.Queue):
+    # Returns None (caller falls back to polling) if watchdog is missing or
+    # inotify cannot be set up, e.g. when the watch limit is exhausted.
+    if Observer is None:
+        return None
+    observer = Observer()
+    observer.schedule(CoaddEventHandler(root, events), str(root), recursive=False)
+    try:
+        observer.start()
+    except OSError:
+        return None
+    return observer
 
 
 def should_process(path: Path, min_age_seconds: int) -> bool:
@@ -25,14 +79,34 @@ def process_test_mode(path: Path, test_output_dir: Path) -> None:
 def main() -> None:
     parser = argparse.ArgumentParser(description="Watch a directory for coadd files and trim matches.")
     parser.add_argument("root", help="Directory containing coadd-*.fits files.")
-    parser.add_argument("csv", help="CSV path with RA/DEC columns.")
+    parser.add_argument("csv", help="CSV or Parquet path with RA/DEC columns.")
     parser.add_argument("--ra-col", default="RA_DESI")
     parser.add_argument("--dec-col", default="DEC_DESI")
     parser.add_argument("--max-arcsec", type=float, default=1.0)
     parser.add_argument("--report-arcsec", type=float, default=3.0)
-    parser.add_argument("--poll-seconds", type=int, default=5)
+    parser.add_argument(
+        "--poll-seconds",
+        type=int,
+        default=5,
+        help="Seconds between checks of pending files (and directory polls without watchdog).",
+    )
     parser.add_argument("--min-age-seconds", type=int, default=30)
     parser.add_argument("--delete-original", action="store_true")
+    parser.add_argument(
+        "--no-mmap",
+        action="store_true",
+        help="Read coadds without memory mapping (e.g. on network filesystems).",
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="Losslessly tile-compress image HDUs in the trimmed output.",
+    )
+    parser.add_argument(
+        "--no-prefilter",
+        action="store_true",
+        help="Index every catalog row instead of only those near the coadd's healpix footprint.",
+    )
     parser.add_argument("--test-mode", action="store_true")
     parser.add_argument("--test-output-dir", default="watcher_test")
     args = parser.parse_args()
@@ -41,38 +115,80 @@ def main() -> None:
     csv_path = Path(args.csv)
     test_output_dir = Path(args.test_output_dir)
 
+    events = queue.Queue()
+    observer = start_observer(root, events)
+    if observer is None:
+        print(f"watchdog/inotify unavailable; polling {root} every {args.poll_seconds}s")
+
+    index = None
+    csv_mtime = None
+    # Resolved path strings of sources handled without leaving a trimmed output.
     seen = set()
-    while True:
-        files = sorted(root.glob("coadd-*.fits"))
-        for path in files:
-            if path.name.endswith(".trimmed.fits") or ".trimmed." in path.name:
-                continue
-            trimmed_path = path.with_suffix(".trimmed.fits")
-            if trimmed_path.exists():
-                continue
-            if path in seen and not args.test_mode:
-                continue
-            if not should_process(path, args.min_age_seconds):
-                continue
-
-            if args.test_mode:
-                process_test_mode(path, test_output_dir)
-                seen.add(path)
-                continue
-
-            trim_coadd_file(
-                path,
-                csv_path,
-                args.ra_col,
-                args.dec_col,
-                args.max_arcsec,
-                args.report_arcsec,
-                None,
-                args.delete_original,
-            )
-            seen.add(path)
-
-        time.sleep(args.poll_seconds)
+    tick = 0
+    # Startup sweep catches files that arrived before the watcher started;
+    # afterwards new paths come from filesystem events (or polling as fallback).
+    pending = set(root.glob(COADD_PATTERN))
+    try:
+        while True:
+            try:
+                pending.add(events.get(timeout=args.poll_seconds))
+            except queue.Empty:
+                pass
+            while not events.empty():
+                pending.add(events.get_nowait())
+            if observer is None:
+                pending.update(root.glob(COADD_PATTERN))
+            tick += 1
+            if tick % SEEN_PURGE_TICKS == 0:
+                seen = {key for key in seen if Path(key).exists()}
+
+            for path in sorted(pending):
+                if not path.exists() or is_trimmed_path(path):
+                    pending.discard(path)
+                    continue
+                trimmed_path = path.with_suffix(".trimmed.fits")
+                if trimmed_path.exists():
+                    pending.discard(path)
+                    continue
+                key = str(path.resolve())
+                if key in seen and not args.test_mode:
+                    pending.discard(path)
+                    continue
+                if not should_process(path, args.min_age_seconds):
+                    # Still being written; check again next tick.
+                    continue
+
+                pending.discard(path)
+                if args.test_mode:
+                    process_test_mode(path, test_output_dir)
+                    seen.add(key)
+                    continue
+
+                # Reload the CSV only when it changes on disk.
+                mtime = csv_path.stat().st_mtime
+                if mtime != csv_mtime:
+                    index = load_or_build_index(csv_path, args.ra_col, args.dec_col)
+                    csv_mtime = mtime
+
+                trim_coadd_file_with_index(
+                    path,
+                    index,
+                    args.max_arcsec,
+                    args.report_arcsec,
+                    None,
+                    args.delete_original,
+                    prefilter=not args.no_prefilter,
+                    memmap=not args.no_mmap,
+                    compress=args.compress,
+                )
+                # The trimmed output is the usual de-dup signal; only remember
+                # sources that did not leave one behind.
+                if not trimmed_path.exists():
+                    seen.add(key)
+    finally:
+        if observer is not None:
+            observer.stop()
+            observer.join()
 
 
 if __name__ == "__main__":
@@ -1,24 +1,49 @@
 #!/usr/bin/env python3
 import argparse
+import os
 import time
 from pathlib import Path
 
+import numpy as np
+from astropy.io import fits
+
+
+def make_fake_coadd(n_rows: int, rng: np.random.Generator) -> fits.HDUList:
+    fibermap = fits.BinTableHDU.from_columns(
+        [
+            fits.Column(name="TARGET_RA", format="D", array=rng.uniform(0.0, 360.0, n_rows)),
+            fits.Column(name="TARGET_DEC", format="D", array=rng.uniform(-90.0, 90.0, n_rows)),
+        ],
+        name="FIBERMAP",
+    )
+    return fits.HDUList([fits.PrimaryHDU(), fibermap])
+
 
 def main() -> None:
-    parser = argparse.ArgumentParser(description="Generate dummy files for watcher test.")
-    parser.add_argument("root", help="Directory to write dummy files into.")
+    parser = argparse.ArgumentParser(description="Generate minimal coadd FITS files for watcher test.")
+    parser.add_argument("root", help="Directory to write test files into.")
     parser.add_argument("--count", type=int, default=5)
-    parser.add_argument("--interval", type=float, default=1.0)
+    parser.add_argument("--rows", type=int, default=10, help="FIBERMAP rows per file.")
+    parser.add_argument(
+        "--age-seconds",
+        type=float,
+        default=0.0,
+        help="Backdate file mtimes by this many seconds (to exercise --min-age-seconds).",
+    )
+    parser.add_argument("--seed", type=int, default=0)
     args = parser.parse_args()
 
     root = Path(args.root)
     root.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(args.seed)
 
     for i in range(args.count):
         path = root / f"coadd-test-{i}.fits"
-        path.write_text(f"dummy {i}\n")
+        make_fake_coadd(args.rows, rng).writeto(path, overwrite=True)
+        if args.age_seconds > 0:
+            stamp = time.time() - args.age_seconds
+            os.utime(path, (stamp, stamp))
         print(f"created {path}")
-        time.sleep(args.interval)
 
 
 if __name__ == "__main__":
@@ -1,4 +1,5 @@
 import unittest
+from pathlib import Path
 
 import numpy as np
 import pandas as pd
@@ -8,19 +9,35 @@ try:
 except Exception as exc:  # pragma: no cover - hard dependency for this test
     raise ImportError("healpy is required for healpix consistency tests") from exc
 
+CHUNK_ROWS = 1_000_000
+
 
 class TestHealpixConsistency(unittest.TestCase):
     def test_csv_healpix_matches_ra_dec(self) -> None:
-        csv_path = "data/DESI_chandra_crossmatch_1arcsec_healpix.csv"
-        df = pd.read_csv(csv_path, usecols=["RA_DESI", "DEC_DESI", "healpix"])
-
-        ra = df["RA_DESI"].values
-        dec = df["DEC_DESI"].values
-        theta = np.deg2rad(90.0 - dec)
-        phi = np.deg2rad(np.mod(ra, 360.0))
-
-        pix16 = hp.ang2pix(16, theta, phi, nest=True)
-        match_rate = (pix16 == df["healpix"].values).mean()
+        columns = ["RA_DESI", "DEC_DESI", "healpix"]
+        parquet_path = Path("data/DESI_chandra_crossmatch_1arcsec_healpix.parquet")
+        if parquet_path.exists():
+            df = pd.read_parquet(parquet_path, columns=columns)
+        else:
+            csv_path = "data/DESI_chandra_crossmatch_1arcsec_healpix.csv"
+            df = pd.read_csv(csv_path, usecols=columns)
+
+        ra = df["RA_DESI"].to_numpy()
+        dec = df["DEC_DESI"].to_numpy()
+        healpix = df["healpix"].to_numpy()
+        # In-place conversions avoid extra full-length temporaries.
+        theta = np.empty_like(dec, dtype=np.float64)
+        np.subtract(90.0, dec, out=theta)
+        theta *= np.pi / 180.0
+        phi = np.mod(ra, 360.0)
+        phi *= np.pi / 180.0
+
+        n_match = 0
+        for start in range(0, len(theta), CHUNK_ROWS):
+            stop = start + CHUNK_ROWS
+            pix16 = hp.ang2pix(16, theta[start:stop], phi[start:stop], nest=True)
+            n_match += int(np.count_nonzero(pix16 == healpix[start:stop]))
+        match_rate = n_match / len(theta)
 
         # Allow a small fraction of mismatches for edge cases or corrupted rows.
         self.assertGreaterEqual(match_rate, 0.999, f"Match rate too low: {match_rate:.6f}")
@@ -0,0 +1,62 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+from astropy.io import fits
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from scripts.trim_coadd_matches import trim_hdul  # noqa: E402
+from scripts.watcher_test_generator import make_fake_coadd  # noqa: E402
+
+N_ROWS = 10
+N_WAVE = 7
+
+
+def make_coadd_with_images() -> fits.HDUList:
+    hdul = make_fake_coadd(N_ROWS, np.random.default_rng(0))
+    flux = np.arange(N_ROWS * N_WAVE, dtype=np.float32).reshape(N_ROWS, N_WAVE) / 3.0
+    mask = np.arange(N_ROWS * N_WAVE, dtype=np.int32).reshape(N_ROWS, N_WAVE) % 4
+    wave = np.linspace(3600.0, 5900.0, N_WAVE)
+    hdul.append(fits.ImageHDU(wave, name="B_WAVELENGTH"))
+    hdul.append(fits.ImageHDU(flux, name="B_FLUX"))
+    hdul.append(fits.ImageHDU(mask, name="B_MASK"))
+    return hdul
+
+
+class TestTrimHdul(unittest.TestCase):
+    def check_round_trip(self, keep_idx: np.ndarray, compress: bool) -> None:
+        src = make_coadd_with_images()
+        trimmed = trim_hdul(src, keep_idx, compress=compress)
+        with tempfile.TemporaryDirectory() as tmp:
+            out_path = Path(tmp) / "coadd-test.trimmed.fits"
+            trimmed.writeto(out_path)
+            with fits.open(out_path) as out:
+                self.assertEqual(len(out["FIBERMAP"].data), len(keep_idx))
+                np.testing.assert_array_equal(
+                    out["FIBERMAP"].data["TARGET_RA"],
+                    src["FIBERMAP"].data["TARGET_RA"][keep_idx],
+                )
+                # Passthrough HDU is unchanged.
+                np.testing.assert_array_equal(out["B_WAVELENGTH"].data, src["B_WAVELENGTH"].data)
+                for name in ("B_FLUX", "B_MASK"):
+                    self.assertEqual(out[name].data.shape, (len(keep_idx), N_WAVE))
+                    # Compression is lossless.
+                    np.testing.assert_array_equal(out[name].data, src[name].data[keep_idx])
+
+    def test_trim_uncompressed(self) -> None:
+        self.check_round_trip(np.array([1, 4, 7]), compress=False)
+
+    def test_trim_compressed(self) -> None:
+        self.check_round_trip(np.array([1, 4, 7]), compress=True)
+
+    def test_trim_zero_matches(self) -> None:
+        for compress in (False, True):
+            with self.subTest(compress=compress):
+                self.check_round_trip(np.array([], dtype=np.int64), compress=compress)
+
+
+if __name__ == "__main__":
+    unittest.main()
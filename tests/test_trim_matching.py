@@ -0,0 +1,49 @@
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from scripts.trim_coadd_matches import (  # noqa: E402
+    arcsec_to_chord,
+    build_catalog_index,
+    build_csv_tree,
+    chord_to_arcsec,
+    coadd_tree,
+    find_match_indices,
+    footprint_rows,
+    radec_to_xyz,
+)
+
+
+class TestTrimMatching(unittest.TestCase):
+    def test_chord_round_trip(self) -> None:
+        arcsec = np.array([0.1, 1.0, 3.0, 3600.0])
+        self.assertTrue(np.allclose(chord_to_arcsec(arcsec_to_chord(arcsec)), arcsec))
+
+    def test_find_match_indices_separations(self) -> None:
+        csv_xyz = radec_to_xyz(np.array([150.0, 10.0]), np.array([2.0, -30.0]))
+        offsets = np.array([0.5, 2.0, 5.0]) / 3600.0
+        coadd_xyz = radec_to_xyz(np.full(3, 150.0), 2.0 + offsets)
+
+        idx_coadd, sep_chord = find_match_indices(
+            build_csv_tree(csv_xyz), coadd_xyz, arcsec_to_chord(3.0)
+        )
+
+        np.testing.assert_array_equal(idx_coadd, [0, 1])
+        np.testing.assert_allclose(chord_to_arcsec(sep_chord), [0.5, 2.0], atol=1e-6)
+
+    def test_footprint_rows_from_buckets(self) -> None:
+        # Rows 0 and 2 sit next to the coadd; row 1 is on the far side of the sky.
+        csv_xyz = radec_to_xyz(np.array([150.0, 330.0, 150.1]), np.array([2.0001, -2.0, 2.1]))
+        coadd_xyz = radec_to_xyz(np.array([150.0]), np.array([2.0]))
+        index = build_catalog_index(csv_xyz)
+
+        np.testing.assert_array_equal(np.sort(footprint_rows(index, coadd_xyz)), [0, 2])
+        np.testing.assert_allclose(coadd_tree(index, coadd_xyz).data, csv_xyz[[0, 2]])
+
+
+if __name__ == "__main__":
+    unittest.main()